@@ -46,17 +46,21 @@ be a separate table that nobody else uses, called 'db-ping'.
 
 import argparse
 import configparser
-import copy
-import dns.resolver
+import dns.exception
+import ipaddress
 import mariadb
 import sys
 import os
-import re
+import queue
 import socket
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor
 
+from .counters import Counters, snapshot
+from . import dns_cache
 from . import worker_status
+from . import worker_dns
 from . import worker_reader
 from . import worker_writer
 from . import worker_ping
@@ -65,62 +69,91 @@ from pprint import pprint
 import inspect
 
 
-def new_connection(config):
+# Main thread and status worker share one connection, ping, reader and writer
+# workers use one each
+POOL_SIZE = 4
+
+# Seconds to wait for workers to stop after printing the summary
+JOIN_TIMEOUT = 2
+
+
+def new_pool(config):
     #pprint(dir(mariadb))
     #pprint(inspect.getmembers(mariadb))
-    conn = mariadb.connect(
-        user=config['user'],
-        password=config['password'],
-        host=config['host'],
-        port=config['port'],
-        database=config['database'],
-        connect_timeout=10,
-        read_timeout=10,
-        write_timeout=10,
-        ssl=True,  # Force TLS protection
-        ssl_verify_cert=not config['insecure'],  # Prevent man-in-the-middle attacks
-        ssl_ca=config['ca_cert'],
+    # One pool shared by all workers. The pool never opens replacement
+    # connections, so each connection reconnects by itself. A worker returns a
+    # failed connection to the pool and checks it out again on the next tick.
+    conn_args = {
+        'user': config['user'],
+        'password': config['password'],
+        'host': config['host'],
+        'port': config['port'],
+        'database': config['database'],
+        'connect_timeout': 10,
+        'read_timeout': 10,
+        'write_timeout': 10,
+        'ssl': True,  # Force TLS protection
+        'ssl_verify_cert': not config['insecure'],  # Prevent man-in-the-middle attacks
+        'ssl_ca': config['ca_cert'],
+    }
+    pool = mariadb.ConnectionPool(
+        pool_name='db-ping',
+        pool_size=POOL_SIZE,
+        pool_reset_connection=False,
     )
-    # https://mariadb-corporation.github.io/mariadb-connector-python/connection.html#auto_reconnect
-    conn.auto_reconnect = True;
-    return conn
+    pool.set_config(**conn_args)
+
+    # Open all connections in parallel, so startup waits for one connection
+    # handshake instead of four in a row
+    with ThreadPoolExecutor(max_workers=POOL_SIZE) as executor:
+        for conn in executor.map(lambda _: mariadb.connect(**conn_args), range(POOL_SIZE)):
+            # https://mariadb-corporation.github.io/mariadb-connector-python/connection.html#auto_reconnect
+            conn.auto_reconnect = True
+            pool.add_connection(conn)
+    return pool
+
+
+def print_log(log):
+    while True:
+        try:
+            line = log.get_nowait()
+        except queue.Empty:
+            break
+        print(line)
 
 
 def print_status(start, now, previous):
-    if now['ping']['seq'] == previous['ping']['seq']:
+    if now.ping.seq == previous.ping.seq:
         # Ping taking longer than 1 second, show time as zero
-        now['ping']['time'] = 0
+        now.ping.time = 0
 
-    if now['ping']['id'] != previous['ping']['id'] or \
-       now['read']['id'] != previous['read']['id']:
+    if now.ping.id != previous.ping.id or \
+       now.read.id != previous.read.id:
         print('Database client reconnected')
 
-    print(
-        '{}#{} {}s (connects: {}/4)'.format(
-            round(time.time()-start),
-            now['seq'],
-            round(now['ping']['time'], 2),
-            1 + now['ping']['connects'] + now['read']['connects'] + now['write']['connects'],
-        )
-    )
+    elapsed = round(time.monotonic() - start)
+    ping_time = round(now.ping.time, 2)
+    total_connects = 1 + now.ping.connects + now.read.connects + now.write.connects
+    print(f'{elapsed}#{now.seq} {ping_time}s (connects: {total_connects}/4)')
     #print('Counters: {} {} {} {}'.format(
-    #    now['seq'],
-    #    now['ping']['seq'],
-    #    now['read']['seq'],
-    #    now['write']['seq'],
+    #    now.seq,
+    #    now.ping.seq,
+    #    now.read.seq,
+    #    now.write.seq,
     #))
 
     # Increment counter on every printed line
-    now['seq'] += 1
+    now.seq += 1
 
 
 def print_summary(config, start, now, previous):
     print(f'--- database server {config["host"]} summary ---')
-    print('Wall clock duration:', round(time.time() - start), 'seconds')
-    print('# Total:', now['seq'])
-    print('# Pings:', now['ping']['seq'], '(SLA:', 100*(now['ping']['seq']/now['seq']), '%)')
-    print('# Reads:', now['read']['seq'], '(SLA:', 100*(now['read']['seq']/now['seq']), '%)')
-    print('# Writes:', now['write']['seq'], '(SLA:', 100*(now['write']['seq']/now['seq']), '%)')
+    print('Wall clock duration:', round(time.monotonic() - start), 'seconds')
+    print('# Total:', now.seq)
+    print('# Pings:', now.ping.seq, '(SLA:', 100*(now.ping.seq/now.seq), '%)')
+    print('# Reads:', now.read.seq, '(SLA:', 100*(now.read.seq/now.seq), '%)')
+    print('# Writes:', now.write.seq, '(SLA:', 100*(now.write.seq/now.seq), '%)')
+    print('# DNS changes:', now.dns.changes)
 
 
 # As config names are not identical to their expected environment variable
@@ -186,17 +219,21 @@ def main(args=None):
     # 2. Values from environment variables
     # 3. Values from my.cnf
     # 4. Values from my.cnf with dash instead of underscore
+    args_dict = vars(args)
+    # Read raw values, as .my.cnf doesn't use INI interpolation and e.g. a % in
+    # a password must be kept as is
+    client_opts = dict(mycnf.items('client', raw=True)) if mycnf.has_section('client') else {}
     for key in config:
-        if key in args and getattr(args, key) != None:
-            config[key] = getattr(args, key)
-        elif key in configEnvMap.keys() and configEnvMap[key] in os.environ and os.environ[configEnvMap[key]]:
+        if args_dict.get(key) is not None:
+            config[key] = args_dict[key]
+        elif key in configEnvMap and os.environ.get(configEnvMap[key]):
             config[key] = os.environ[configEnvMap[key]]
             configFromEnvironmentVariables.append(configEnvMap[key])
-        elif 'client' in mycnf.sections() and mycnf.has_option('client', key):
-            config[key] = mycnf.get('client', key)
+        elif key in client_opts:
+            config[key] = client_opts[key]
             configFromConfigFiles.append(key)
-        elif 'client' in mycnf.sections() and mycnf.has_option('client', key.replace('_', '-')):
-            config[key] = mycnf.get('client', key.replace('_', '-'))
+        elif key.replace('_', '-') in client_opts:
+            config[key] = client_opts[key.replace('_', '-')]
             configFromConfigFiles.append(key)
 
     # Check that there is a value for each field
@@ -220,17 +257,18 @@ def main(args=None):
     )
 
     # Measure total wall clock time for execution
-    start = time.time()
+    start = time.monotonic()
 
     try:
-        conn = new_connection(config)
+        pool = new_pool(config)
+        conn = pool.get_connection()
     except mariadb.OperationalError as e:
         # E.g. unknown host
         print(f'Error: Unable to connect: {e}')
         sys.exit(1)
     except mariadb.Error as e:
         print(f'Error: Connection failed: {e}')
-        connection_time = round(time.time() - connect_start, 1)
+        connection_time = round(time.monotonic() - start, 1)
         if round(connection_time) == 10:
             print('Error: Timeout after 10 seconds')
         else:
@@ -241,28 +279,53 @@ def main(args=None):
         print(f'Error: {e}')
         sys.exit(1)
 
-    # Check if host starts like an IPv4 or IPv6 address
-    if re.search('(^[0-9]{1,3}\.)|(^[0-9a-fA-F]{1,4}:)', config['host']):
+    # Check if host is an IPv4 or IPv6 address
+    try:
+        ipaddress.ip_address(config['host'])
+        is_ip = True
+    except ValueError:
+        is_ip = False
+
+    # Only looked up for hostnames
+    canonical_name = None
+    dns_error = None
+
+    if is_ip:
         # Show what name IP resolves to
         addr_info = socket.gethostbyaddr(config['host'])[0]
     else:
         # Show what IP name resolves to
-        # Define type=6 to only get each IP only once in result set
-        addrinfo = socket.getaddrinfo(config['host'], config['port'], 0, 6)
+        # Define stream socket type to get each IP only once in result set
+        addrinfo = socket.getaddrinfo(
+            config['host'],
+            config['port'],
+            family=socket.AF_UNSPEC,
+            type=socket.SOCK_STREAM,
+        )
         ip_list = list()
         for addr in addrinfo:
             ip_list.append(addr[4][0])
         addr_info = ', '.join(ip_list)
 
-        dns_response = dns.resolver.query(config['host'])
-        dns_expiry = round(dns_response.expiration - time.time())
+        # Same A and AAAA lookup as the DNS monitoring thread does later
+        # A failing lookup (e.g. name only in /etc/hosts or a slow resolver)
+        # must not stop db-ping, as connecting already succeeded
+        try:
+            _, canonical_name, dns_expiration = dns_cache.lookup(config['host'])
+        except dns.exception.DNSException as e:
+            print(f'DNS lookup failed with error: {e}')
+            # Tell the DNS monitoring thread, so it doesn't print it again
+            dns_error = str(e)
+        else:
+            if dns_expiration is not None:
+                dns_expiry = round(dns_expiration - time.time())
         # @TODO: Check if record has DNSSEC signature yes/no
         # @TODO: Check if DNSSEC signature is valid/invalid
 
     print(f'Successfully connected to {conn.server_name} ({addr_info})')
 
-    if dns_response:
-        print(f'Hostname resolves to {dns_response.canonical_name.to_text()}')
+    if canonical_name is not None:
+        print(f'Hostname resolves to {canonical_name}')
         print(f'DNS record expires in {dns_expiry} seconds')
 
     #pprint(dir(conn))
@@ -293,44 +356,26 @@ def main(args=None):
     threads = list()
 
     # Flag to tell other threads we'd like to stop
+    # Workers don't print directly but put their output lines in the log queue,
+    # which the main thread prints in between the status lines
     control = {
         'config': config,
-        'run': True
+        'run': True,
+        'log': queue.SimpleQueue(),
     }
 
-    # Shared counters
-    # Prevent race conditions by ensuring each thread only writes to a branch of
-    # the dict that nobody else writes to. Summarize all stats in main thread code.
-    counters = {
-        'ping': {
-            'id': 0,  # connection id
-            'connects': 0,
-            'seq': 0,  # sequence number, always increments by one
-            'time': 0.0,  # time logged for latest
-        },
-        'read': {
-            'id': 0,
-            'connects': 0,
-            'seq': 0,
-            'time': 0.0,
-        },
-        'write': {
-            'id': 0,
-            'connects': 0,
-            'seq': 0,
-            'time': 0.0,
-        },
-        'seq': 1,  # Start top-level print counter at 1
-    }
+    # Shared counters, see counters.py
+    counters = Counters()
 
     # Copy of previous values
-    old_counters = copy.deepcopy(counters)
+    old_counters = snapshot(counters)
 
     try:
         # Add thread for general database information and printer
         threads.append(
             threading.Thread(
                 target=worker_status.run,
+                name='status',
                 kwargs={'conn': conn, 'control': control, 'counters': counters}
             )
         )
@@ -339,7 +384,8 @@ def main(args=None):
         threads.append(
             threading.Thread(
                 target=worker_ping.run,
-                kwargs={'conn': new_connection(config), 'control': control, 'counters': counters}
+                name='ping',
+                kwargs={'pool': pool, 'control': control, 'counters': counters}
             )
         )
 
@@ -347,7 +393,8 @@ def main(args=None):
         threads.append(
             threading.Thread(
                 target=worker_reader.run,
-                kwargs={'conn': new_connection(config), 'control': control, 'counters': counters}
+                name='reader',
+                kwargs={'pool': pool, 'control': control, 'counters': counters}
             )
         )
 
@@ -355,49 +402,74 @@ def main(args=None):
         threads.append(
             threading.Thread(
                 target=worker_writer.run,
-                kwargs={'conn': new_connection(config), 'control': control, 'counters': counters}
+                name='writer',
+                kwargs={'pool': pool, 'control': control, 'counters': counters}
             )
         )
 
+        # Add thread for monitoring DNS changes of hostname
+        if not is_ip:
+            threads.append(
+                threading.Thread(
+                    target=worker_dns.run,
+                    name='dns',
+                    kwargs={'control': control, 'counters': counters, 'error': dns_error}
+                )
+            )
+
 
         # Start all threads
         for i in range(0, len(threads)):
             threads[i].start()
 
         # Reset total wall clock here to ensure it starts from zero as the threads do
-        start = time.time()
+        start = time.monotonic()
 
         while control['run']:
             # Tick every second, always show steady wall time. If a child thread is
             # too slow, counters don't update and just show zero for that round.
             time.sleep(1)
             # Print immediately after sleep, shows latest results
+            print_log(control['log'])
             print_status(start, counters, old_counters)
-            old_counters = copy.deepcopy(counters)
-
-            # Stop if number of threads drop (meaning one crashed)
-            if threading.active_count() < 4:
-                print('Error: thread died')
-                control['run'] = False
+            # Flush once per tick
+            sys.stdout.flush()
+            old_counters = snapshot(counters)
 
-        # Wait for all threads to complete
-        # @TODO: Not really necessary for when Ctrl+C is the exit method
-        for i in range(0, len(threads)):
-            threads[i].join()
+            # Stop if any of the ping, reader, writer or dns threads stopped
+            # (meaning one crashed). The status thread exits after printing its output.
+            for thread in threads[1:]:
+                if not thread.is_alive():
+                    print(f'Error: {thread.name} thread died')
+                    control['run'] = False
 
         # This will not print on Ctrl+C but it will print if threads died and thus stop
         print('Aborting...')
 
     except KeyboardInterrupt:
-        control['run'] = False
         print('Aborting on CTRL+C...')
 
     finally:
-        # Always print summary, no matter the cause of stopping
+        # Tell threads to stop
+        control['run'] = False
+
+        # Always print summary right away, no matter the cause of stopping.
+        # Don't wait for workers, as one may be stuck in a slow query.
+        print_log(control['log'])
         print_summary(config, start, counters, old_counters)
 
-    # Free resources
-    conn.close()
+        # Give workers a moment to return their connections before the pool is
+        # closed below, a worker ticks once per second
+        deadline = time.monotonic() + JOIN_TIMEOUT
+        for thread in threads:
+            if thread.is_alive():
+                thread.join(timeout=max(deadline - time.monotonic(), 0))
+
+    # Free resources, unless a stuck worker still uses its connection. Then
+    # they are freed when db-ping exits.
+    if not any(thread.is_alive() for thread in threads):
+        conn.close()
+        pool.close()
 
 
 if __name__=='__main__':
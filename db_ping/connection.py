@@ -0,0 +1,16 @@
+import mariadb
+
+
+def close(conn, cur=None):
+    # Closing the cursor or a broken connection may fail, but the connection
+    # must still be returned to the pool and stopping the worker must not fail
+    # because of it
+    if cur is not None:
+        try:
+            cur.close()
+        except mariadb.Error:
+            pass
+    try:
+        conn.close()
+    except mariadb.Error:
+        pass
@@ -0,0 +1,38 @@
+from dataclasses import dataclass, field, replace
+
+
+# Prevent race conditions by ensuring each thread only writes to its own
+# branch that nobody else writes to. Summarize all stats in main thread code.
+@dataclass(slots=True)
+class WorkerCounters:
+    id: int = 0  # connection id
+    connects: int = 0
+    seq: int = 0  # sequence number, always increments by one
+    time: float = 0.0  # time logged for latest
+    processlist_count: int = 0
+
+
+@dataclass(slots=True)
+class DnsCounters:
+    changes: int = 0  # number of times resolved addresses changed
+
+
+@dataclass(slots=True)
+class Counters:
+    ping: WorkerCounters = field(default_factory=WorkerCounters)
+    read: WorkerCounters = field(default_factory=WorkerCounters)
+    write: WorkerCounters = field(default_factory=WorkerCounters)
+    dns: DnsCounters = field(default_factory=DnsCounters)
+    seq: int = 1  # Start top-level print counter at 1
+
+
+def snapshot(counters):
+    # Each worker only writes to its own branch, so a shallow copy per branch is
+    # enough to capture the previous values
+    return replace(
+        counters,
+        ping=replace(counters.ping),
+        read=replace(counters.read),
+        write=replace(counters.write),
+        dns=replace(counters.dns),
+    )
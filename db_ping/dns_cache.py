@@ -0,0 +1,46 @@
+import dns.resolver
+import time
+
+# Reuse one resolver for all lookups and cache answers until their TTL expires,
+# but for at most this many seconds so a very long TTL doesn't hide changes
+MAX_AGE = 300
+
+resolver = None
+cache = {}
+
+
+def resolve(host, rdtype):
+    global resolver
+
+    # DNS answer expiration is a wall clock timestamp
+    answer, expires = cache.get((host, rdtype), (None, 0))
+    if time.time() >= expires:
+        # Create the resolver only when a hostname is looked up, as reading
+        # /etc/resolv.conf may fail and IP addresses don't need it
+        if resolver is None:
+            resolver = dns.resolver.Resolver()
+        # Apply resolv.conf search domains to short names like the deprecated
+        # dns.resolver.query() did
+        answer = resolver.resolve(host, rdtype, lifetime=2.0, search=True)
+        cache[(host, rdtype)] = (answer, min(answer.expiration, time.time() + MAX_AGE))
+    return answer
+
+
+def lookup(host):
+    # Resolve both IPv4 and IPv6 addresses of host. Returns the addresses, the
+    # canonical name and when the first of the records expires.
+    addresses = set()
+    canonical_name = None
+    expiration = None
+    for rdtype in ('A', 'AAAA'):
+        try:
+            answer = resolve(host, rdtype)
+        except dns.resolver.NoAnswer:
+            # E.g. no IPv6 address for host
+            continue
+        addresses.update(rr.to_text() for rr in answer)
+        if canonical_name is None:
+            canonical_name = answer.canonical_name.to_text()
+        if expiration is None or answer.expiration < expiration:
+            expiration = answer.expiration
+    return addresses, canonical_name, expiration
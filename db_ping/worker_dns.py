@@ -0,0 +1,54 @@
+import dns.exception
+import time
+
+from . import dns_cache
+
+# Re-resolve at most this often, as the records may have a very short TTL
+MIN_INTERVAL = 5
+
+
+def run(control, counters, error=None):
+    # error is the failure of the lookup at startup, if any, already printed
+    host = control['config']['host']
+    dc = counters.dns
+    log = control['log']
+
+    addresses = None
+    while control['run']:
+        try:
+            new_addresses, _, expiration = dns_cache.lookup(host)
+        except dns.exception.DNSException as e:
+            if str(e) == error:
+                # Same failure again, e.g. a name only in /etc/hosts fails on
+                # every lookup. Don't log it again and retry less often.
+                expiration = time.time() + dns_cache.MAX_AGE
+            else:
+                # New failure, maybe a transient one. Retry soon so a DNS
+                # change isn't missed.
+                error = str(e)
+                log.put_nowait(f'DNS lookup failed with error: {e}')
+                expiration = time.time()
+        else:
+            error = None
+            if addresses is not None and new_addresses != addresses:
+                log.put_nowait(
+                    'Warning: Hostname {} changed from {} to {}'.format(
+                        host,
+                        ', '.join(sorted(addresses)),
+                        ', '.join(sorted(new_addresses)),
+                    )
+                )
+                dc.changes += 1
+            addresses = new_addresses
+
+        # Re-resolve when the records expire, or when the cache drops them
+        # sooner. DNS expiration is a wall clock timestamp, but the wait is
+        # measured with the monotonic clock. Sleep in one second steps to notice
+        # quickly when db-ping stops.
+        if expiration is None:
+            # No records found
+            expiration = time.time()
+        interval = min(max(expiration - time.time(), MIN_INTERVAL), dns_cache.MAX_AGE)
+        deadline = time.monotonic() + interval
+        while control['run'] and time.monotonic() < deadline:
+            time.sleep(1)
@@ -1,34 +1,62 @@
 import mariadb
 import time
-from contextlib import closing
 
-def run(conn, control, counters):
-    with closing(conn):
+from .connection import close
+
+
+def run(pool, control, counters):
+    conn = None
+    # Bind the worker's own counters branch and often used names locally
+    pc = counters.ping
+    log = control['log']
+    monotonic = time.monotonic
+
+    next_tick = monotonic()
+    try:
         while control['run']:
 
-                start = time.time()
+                start = monotonic()
                 try:
+                    # Check out a connection from the pool, again if the
+                    # previous one failed. Ping reconnects a dropped connection.
+                    if conn is None:
+                        conn = pool.get_connection()
+                        if conn is None:
+                            raise mariadb.PoolError('No connection available')
                     conn.ping()
                 except mariadb.Error as e:
-                    print(
+                    log.put_nowait(
                         'Ping failed after {} seconds with error: {}'.format(
-                            round(time.time() - start, 2),
+                            round(monotonic() - start, 2),
                             e,
                         )
                     )
+                    # Return failed connection to the pool
+                    if conn is not None:
+                        close(conn)
+                        conn = None
                 else:
-                    if counters['ping']['id'] != conn.connection_id:
-                        counters['ping']['id'] = conn.connection_id
-                        counters['ping']['connects'] += 1
+                    if pc.id != conn.connection_id:
+                        pc.id = conn.connection_id
+                        pc.connects += 1
 
-                # Always update time
-                counters['ping']['time'] = time.time() - start
+                # Always update time, sample the clock once for both time and sleep
+                now = monotonic()
+                pc.time = now - start
 
                 # Increment counter
-                counters['ping']['seq'] += 1
+                pc.seq += 1
 
-                # Sleep must be accurately one second if the query was less than a
-                # second. If the query was over a second, the SLA as tracked by this
-                # tool is breached and sleeping a full second is correct behaviour.
-                if counters['write']['time'] < 1:
-                    time.sleep(1-counters['write']['time'])
+                # Sleep until one second after the previous tick, so ticks don't drift.
+                # If the query was over a second, the SLA as tracked by this tool is
+                # breached and the next tick starts right away without trying to catch
+                # up on the missed ticks.
+                next_tick += 1.0
+                sleep = next_tick - now
+                if sleep > 0:
+                    time.sleep(sleep)
+                else:
+                    next_tick = now
+    finally:
+        if conn is not None:
+            close(conn)
@@ -1,51 +1,73 @@
 import mariadb
 import time
-from contextlib import closing
+
+from .connection import close
 
 from pprint import pprint
 
 
-def run(conn, control, counters):
-    with closing(conn), closing(conn.cursor()) as cur:
+def run(pool, control, counters):
+    conn = cur = None
+    # Bind the worker's own counters branch and often used names locally
+    rc = counters.read
+    log = control['log']
+    monotonic = time.monotonic
+
+    next_tick = monotonic()
+    try:
         while control['run']:
 
-            start = time.time()
+            start = monotonic()
             try:
-                cur.execute("SELECT count(*) FROM information_schema.processlist")
-            except mariadb.Error as e:
-                print(
-                    'Failed after {} seconds with error: {}'.format(
-                        round(time.time() - start, 2), e
-                    )
-                )
-            else:
+                # Check out a connection from the pool, again if the previous
+                # one failed, as it reconnects by itself. Keep one prepared
+                # cursor per checkout so the server parses the query only once.
+                if conn is None:
+                    conn = pool.get_connection()
+                    if conn is None:
+                        raise mariadb.PoolError('No connection available')
+                    cur = conn.cursor(prepared=True)
+                cur.execute("SELECT count(*) FROM information_schema.processlist", ())
                 # print(
                 #     'Succeeded in {} seconds (connection id: {})'.format(
-                #         round(time.time() - start, 2),
+                #         round(monotonic() - start, 2),
                 #         conn.connection_id
                 #     )
                 # )
-                for row in cur:
-                    # print(
-                    #     'Succeeded in {} seconds (connection id: {})'.format(
-                    #         round(time.time() - start, 2),
-                    #         conn.connection_id
-                    #     )
-                    # )
-                    counters['read']['processlist_count'] = row[0]
-
-                if counters['read']['id'] != conn.connection_id:
-                    counters['read']['id'] = conn.connection_id
-                    counters['read']['connects'] += 1
-
-            # Always update time
-            counters['read']['time'] = time.time() - start
+                # Query always returns exactly one row
+                rc.processlist_count = cur.fetchone()[0]
+            except mariadb.Error as e:
+                log.put_nowait(
+                    'Failed after {} seconds with error: {}'.format(
+                        round(monotonic() - start, 2), e
+                    )
+                )
+                # Return failed connection to the pool
+                if conn is not None:
+                    close(conn, cur)
+                    conn = cur = None
+            else:
+                if rc.id != conn.connection_id:
+                    rc.id = conn.connection_id
+                    rc.connects += 1
+
+            # Always update time, sample the clock once for both time and sleep
+            now = monotonic()
+            rc.time = now - start
 
             # Increment counter
-            counters['read']['seq'] += 1
+            rc.seq += 1
 
-            # Sleep must be accurately one second if the query was less than a
-            # second. If the query was over a second, the SLA as tracked by this
-            # tool is breached and sleeping a full second is correct behaviour.
-            if counters['write']['time'] < 1:
-                time.sleep(1-counters['write']['time'])
+            # Sleep until one second after the previous tick, so ticks don't drift.
+            # If the query was over a second, the SLA as tracked by this tool is
+            # breached and the next tick starts right away without trying to catch
+            # up on the missed ticks.
+            next_tick += 1.0
+            sleep = next_tick - now
+            if sleep > 0:
+                time.sleep(sleep)
+            else:
+                next_tick = now
+    finally:
+        if conn is not None:
+            close(conn, cur)
@@ -7,8 +7,44 @@ from pprint import pprint
 import inspect
 
 
+# Unknown table (1109) and feature disabled (3167) errors for the combined
+# query: information_schema.GLOBAL_STATUS and GLOBAL_VARIABLES are not
+# available e.g. in MySQL 5.7 and newer, where they moved to performance_schema
+FALLBACK_ERRORS = (1109, 3167)
+
+
+def fallback(conn, control):
+    # Query values one by one, so each one either succeeds or fails
+    # independently. Use a plain cursor, as MySQL doesn't support SHOW
+    # statements over the prepared statement protocol.
+    values = []
+    with closing(conn.cursor(buffered=True)) as cur:
+        for query, params, column in [
+            ("SHOW STATUS LIKE 'uptime'", (), 1),
+            (
+                "SELECT host FROM information_schema.processlist WHERE id=?",
+                (conn.connection_id,),
+                0,
+            ),
+            ("SHOW VARIABLES LIKE 'hostname'", (), 1),
+            ("SHOW VARIABLES LIKE 'max_connections'", (), 1),
+            ("SHOW STATUS LIKE 'threads_connected'", (), 1),
+        ]:
+            try:
+                cur.execute(query, params)
+            except mariadb.Error as e:
+                control['log'].put_nowait(f"Error: {e}")
+                values.append(None)
+            else:
+                values.append(cur.fetchone()[column])
+    return values
+
+
 def run(conn, control, counters):
-    with closing(conn.cursor()) as cur:
+    # Prepared cursor, the processlist id lookup is sent as a bound parameter.
+    # Buffered so the result is read fully and the connection is free for the
+    # next query right away.
+    with closing(conn.cursor(prepared=True, buffered=True)) as cur:
         """
         SHOW STATUS LIKE "uptime"
 
@@ -25,51 +61,50 @@ def run(conn, control, counters):
          ('warnings', 0)
         """
 
-        try:
-            cur.execute("SHOW STATUS LIKE 'uptime'")
-        except mariadb.Error as e:
-            print(f"Error: {e}")
-        else:
-            if not control['config']['quiet']:
-                uptime = timedelta(seconds=int(cur.fetchone()[1]))
-                print(f'Uptime: {uptime}')
-
+        # Fetch all status values in one round-trip instead of one query each
+        # Parsing the 'SHOW PROCESSLIST' would probable be more useful than
+        # just the number of threads connected
         try:
             cur.execute(
-                "SELECT host FROM information_schema.processlist WHERE id=?",
+                """
+                SELECT
+                  (SELECT VARIABLE_VALUE FROM information_schema.GLOBAL_STATUS
+                   WHERE VARIABLE_NAME='Uptime'),
+                  (SELECT host FROM information_schema.processlist
+                   WHERE id=?),
+                  (SELECT VARIABLE_VALUE FROM information_schema.GLOBAL_VARIABLES
+                   WHERE VARIABLE_NAME='hostname'),
+                  (SELECT VARIABLE_VALUE FROM information_schema.GLOBAL_VARIABLES
+                   WHERE VARIABLE_NAME='max_connections'),
+                  (SELECT VARIABLE_VALUE FROM information_schema.GLOBAL_STATUS
+                   WHERE VARIABLE_NAME='Threads_connected')
+                """,
                 (conn.connection_id,),
             )
         except mariadb.Error as e:
-            print(f"Error: {e}")
+            if e.errno in FALLBACK_ERRORS:
+                values = fallback(conn, control)
+            else:
+                control['log'].put_nowait(f"Error: {e}")
+                values = [None] * 5
         else:
-            if not control['config']['quiet']:
-                client_connection = cur.fetchone()[0]
-                print(f'Client connection: {client_connection}')
+            values = cur.fetchone()
 
-        try:
-            cur.execute("SHOW VARIABLES LIKE 'hostname'")
-        except mariadb.Error as e:
-            print(f"Error: {e}")
-        else:
-            if not control['config']['quiet']:
-                server_hostname = cur.fetchone()[1]
-                print(f'Server hostname: {server_hostname}')
-
-        try:
-            cur.execute("SHOW VARIABLES LIKE 'max_connections'")
-        except mariadb.Error as e:
-            print(f"Error: {e}")
-        else:
-            if not control['config']['quiet']:
-                max_connections = cur.fetchone()[1]
-                print(f'Max connections: {max_connections}')
-
-        # Parsing the 'SHOW PROCESSLIST' would probable be more useful
-        try:
-            cur.execute("SHOW STATUS LIKE 'threads_connected'")
-        except mariadb.Error as e:
-            print(f"Error: {e}")
-        else:
-            if not control['config']['quiet']:
-                threads_connected = cur.fetchone()[1]
-                print(f'Connections open at server: {threads_connected}')
+        (
+            uptime,
+            client_connection,
+            server_hostname,
+            max_connections,
+            threads_connected,
+        ) = values
+        if not control['config']['quiet']:
+            if uptime is not None:
+                control['log'].put_nowait(f'Uptime: {timedelta(seconds=int(uptime))}')
+            if client_connection is not None:
+                control['log'].put_nowait(f'Client connection: {client_connection}')
+            if server_hostname is not None:
+                control['log'].put_nowait(f'Server hostname: {server_hostname}')
+            if max_connections is not None:
+                control['log'].put_nowait(f'Max connections: {max_connections}')
+            if threads_connected is not None:
+                control['log'].put_nowait(f'Connections open at server: {threads_connected}')
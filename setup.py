@@ -21,5 +21,6 @@ setup(
     install_requires=open("requirements.txt").read().splitlines(),
     url="https://github.com/ottok/db-ping",
     packages = ['db_ping'],
+    python_requires='>=3.10',  # dataclass(slots=True)
     entry_points={ 'console_scripts': [ 'db-ping=db_ping.__main__:main' ] },
 )